@@ -0,0 +1,80 @@
+"""Benchmark for filtered GET /questions.
+
+Grows the questions table and times a selective filter at every size.
+Each size holds the same NEEDLES matching rows, so with the
+(category, difficulty, id) index the latency should stay flat while
+the table grows. Run against a throwaway database, it is truncated:
+
+    createdb trivia_bench
+    python benchmark_filters.py
+"""
+import os
+import random
+import statistics
+import time
+
+from flaskr import create_app
+from flaskr.models import db, Question, Category
+
+database_name = os.environ.get('BENCHMARK_DATABASE', 'trivia_bench')
+database_path = "postgres://{}:{}@{}/{}".format(
+    'postgres', 'psql', 'localhost:5432', database_name)
+
+TABLE_SIZES = [1000, 10000, 100000, 1000000]
+NEEDLES = 10
+REQUESTS = 200
+SELECTIVE_FILTER = '/questions?category=1&min_difficulty=5&sort=-id&page=1'
+
+
+def seed(size):
+    # truncate, a delete would leave the dead rows of the last size
+    db.session.execute('TRUNCATE questions RESTART IDENTITY')
+    if Category.query.count() == 0:
+        for category_type in ['Science', 'Art', 'Geography',
+                              'History', 'Entertainment', 'Sports']:
+            db.session.add(Category(category_type))
+    db.session.flush()
+
+    rows = [{
+        'question': 'Benchmark question {}'.format(index),
+        'answer': 'answer',
+        'category': str(random.randint(1, 6)),
+        'difficulty': random.randint(1, 4)
+    } for index in range(size - NEEDLES)]
+    rows += [{
+        'question': 'Needle question {}'.format(index),
+        'answer': 'answer',
+        'category': '1',
+        'difficulty': 5
+    } for index in range(NEEDLES)]
+
+    db.session.bulk_insert_mappings(Question, rows)
+    db.session.commit()
+    db.session.execute('ANALYZE questions')
+    db.session.commit()
+
+
+def measure(client):
+    timings = []
+    for _ in range(REQUESTS):
+        start = time.perf_counter()
+        res = client.get(SELECTIVE_FILTER)
+        timings.append(time.perf_counter() - start)
+        assert res.status_code == 200
+        assert res.get_json()['total_questions'] == NEEDLES
+    return statistics.median(timings), sorted(timings)[int(REQUESTS * 0.95)]
+
+
+if __name__ == '__main__':
+    app = create_app({'DATABASE_PATH': database_path})
+    client = app.test_client()
+    # keep the typeahead build over the previous run's rows out of the timings
+    app.extensions['suggestions'].wait()
+
+    with app.app_context():
+        print('{:>10} {:>12} {:>12}'.format('rows', 'median ms', 'p95 ms'))
+        for size in TABLE_SIZES:
+            seed(size)
+            median, p95 = measure(client)
+            print('{:>10} {:>12.2f} {:>12.2f}'.format(
+                size, median * 1000, p95 * 1000))
@@ -3,12 +3,23 @@ from flask import Flask, request, abort, jsonify
 import json
 from flask_sqlalchemy import SQLAlchemy
 from flask_cors import CORS
+from itsdangerous import URLSafeTimedSerializer, BadSignature
 import random
+import re
 from sqlalchemy import func
 
-from flaskr.models import setup_db, Question, Category
+from flaskr.models import setup_db, database_path, Question, Category
+from flaskr.leaderboard import Leaderboard
+from flaskr.suggestions import SuggestionIndex
+from flaskr.trie import MAX_COMPLETIONS
+from flaskr.filters import parse_question_filters, query_questions
 
 QUESTIONS_PER_PAGE = 10
+LEADERBOARD_SIZE = 10
+SUGGESTIONS_LIMIT = 5
+QUIZ_TOKEN_MAX_AGE = 60 * 60
+ANSWER_PUNCTUATION = r'[.,/#!$%^&*;:{}=\-_`~()]'
+ARTICLES = ('the', 'a', 'an')
 
 
 def paginate_questions(request, selection):
@@ -22,10 +33,39 @@ def paginate_questions(request, selection):
     return current_question
 
 
+def is_int(value):
+    # bool is an int subclass, but true/false are not ids
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+def normalize_answer(text):
+    words = re.sub(ANSWER_PUNCTUATION, '', text).lower().split()
+    # "Palace of Versailles" answers "The Palace of Versailles"
+    if len(words) > 1 and words[0] in ARTICLES:
+        words = words[1:]
+    return ' '.join(words)
+
+
+def evaluate_answer(answer, guess):
+    return normalize_answer(guess) == normalize_answer(answer)
+
+
 def create_app(test_config=None):
     # create and configure the app
     app = Flask(__name__)
-    setup_db(app)
+    if test_config is not None:
+        app.config.update(test_config)
+    # quiz tokens must verify on every worker, so set SECRET_KEY when
+    # running more than one process
+    app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY', os.urandom(24))
+    setup_db(app, app.config.get('DATABASE_PATH', database_path))
+    leaderboard = Leaderboard(app)
+    app.extensions['leaderboard'] = leaderboard
+    quiz_tokens = URLSafeTimedSerializer(
+        app.config['SECRET_KEY'], salt='quiz-answer')
+    suggestion_index = SuggestionIndex(app)
+    app.extensions['suggestions'] = suggestion_index
+    suggestion_index.start()
 
     '''
   @TODO: Set up CORS. Allow '*' for origins. Delete the sample route after completing the TODOs
@@ -75,22 +115,31 @@ def create_app(test_config=None):
     @app.route('/questions', methods=['GET'])
     def retrieve_questions():
         try:
-            selection = Question.query.order_by('id').all()
-            result = [item.format for item in selection]
-            page = request.args.get('page')
+            try:
+                filters = parse_question_filters(request.args)
+            except ValueError:
+                abort(422)
+
+            page = request.args.get('page', type=int)
+            if page is None and 'page' in request.args:
+                abort(422)
 
-            if page:
-                paged_result = paginate_questions(request, selection)
+            if page is None:
+                questions, total = query_questions(filters)
+            elif page < 1:
+                abort(422)
             else:
-                paged_result = result
+                questions, total = query_questions(
+                    filters, limit=QUESTIONS_PER_PAGE,
+                    offset=(page - 1) * QUESTIONS_PER_PAGE)
 
             categories = Category.query.order_by('id').all()
             formateed_categories = [item.format for item in categories]
 
             return jsonify({
                 'success': True,
-                'questions': paged_result,
-                'total_questions': len(selection),
+                'questions': [question.format for question in questions],
+                'total_questions': total,
                 'current_category': None,
                 'categories': formateed_categories
             })
@@ -112,6 +161,7 @@ def create_app(test_config=None):
                 abort(404)
 
             question.delete()
+            suggestion_index.remove_question(question_id)
             selection = Question.query.order_by('id').all()
             result = [item.format for item in selection]
             paged_result = paginate_questions(request, selection)
@@ -171,10 +221,16 @@ def create_app(test_config=None):
                 if question is None or answer is None or category is None or difficulty is None:
                     abort(422)
 
+                # the category must name an existing category id
+                if not str(category).isdigit() or \
+                        Category.query.get(int(category)) is None:
+                    abort(422)
+
                 new_question = Question(
                     question=question, answer=answer, category=category,
                     difficulty=difficulty)
                 new_question.insert()
+                suggestion_index.add_question(new_question)
 
                 selection = Question.query.order_by('id').all()
                 paged_questions = paginate_questions(request, selection)
@@ -207,6 +263,33 @@ def create_app(test_config=None):
   category to be shown. 
   '''
 
+    '''
+  Typeahead suggestions for the search box. Returns the most
+  common question words and titles starting with "q", optionally
+  limited to a category. Only the best MAX_COMPLETIONS are kept
+  per prefix, so a "limit" above that is rejected with 422.
+  '''
+
+    @app.route('/questions/suggestions')
+    def get_question_suggestions():
+        try:
+            prefix = request.args.get('q', '')
+            category_id = request.args.get('category', 0, type=int)
+            limit = request.args.get('limit', SUGGESTIONS_LIMIT, type=int)
+
+            if limit < 1 or limit > MAX_COMPLETIONS:
+                abort(422)
+
+            suggestions = suggestion_index.suggest(
+                prefix, category_id, limit)
+
+            return jsonify({
+                'success': True,
+                'suggestions': suggestions
+            })
+        except():
+            abort(500)
+
     @app.route('/questions/<int:question_id>')
     def get_question_by_Id(question_id):
         try:
@@ -273,11 +356,21 @@ def create_app(test_config=None):
         try:
             body = request.get_json()
 
-            if body.get('quiz_category') is None or body.get('previous_questions') is None:
+            if not isinstance(body, dict) or \
+                    not isinstance(body.get('quiz_category'), dict) or \
+                    not isinstance(body.get('previous_questions'), list):
                 abort(422)
 
-            quiz_category_id = body.get('quiz_category', None)['id']
+            quiz_category_id = body.get('quiz_category', None).get('id')
             previous_questions = body.get('previous_questions', None)
+            player = body.get('player', 'anonymous')
+
+            if not is_int(quiz_category_id) or \
+                    not isinstance(player, str) or not player:
+                abort(422)
+            if quiz_category_id != 0 and \
+                    Category.query.get(quiz_category_id) is None:
+                abort(422)
 
             if quiz_category_id == 0:
                 questions = Question.query.order_by(func.random()).all()
@@ -298,9 +391,19 @@ def create_app(test_config=None):
                         available_questions.append(q)
 
             if len(available_questions) > 0:
+                question = available_questions[0]
+                # the answer is only revealed by /quizzes/answer
+                del question['answer']
+                token = quiz_tokens.dumps({
+                    'player': player,
+                    'question_id': question['id'],
+                    'category': quiz_category_id
+                })
+
                 return jsonify({
                     'success': True,
-                    'question': available_questions[0]
+                    'question': question,
+                    'token': token
                 })
             else:
                 return jsonify({
@@ -310,6 +413,108 @@ def create_app(test_config=None):
         except():
             abort(422)
     '''
+  Submit an answer for the question currently being played.
+  /quizzes hands out a signed token with each question that binds
+  the player, the question and the quiz category (id 0 for "ALL"),
+  the answer must send it back with the guess. A guess is correct
+  when it matches the whole answer, and a player scores a point for
+  each question at most once. Returns the answer, whether the guess
+  was correct and scored, and the player's score and rank.
+  '''
+
+    @app.route('/quizzes/answer', methods=['POST'])
+    def submit_quiz_answer():
+        try:
+            body = request.get_json()
+
+            if not isinstance(body, dict):
+                abort(422)
+
+            token = body.get('token', None)
+            guess = body.get('guess', None)
+
+            if not isinstance(token, str) or not isinstance(guess, str):
+                abort(422)
+
+            try:
+                played = quiz_tokens.loads(
+                    token, max_age=QUIZ_TOKEN_MAX_AGE)
+            except BadSignature:
+                abort(422)
+
+            player = played['player']
+            quiz_category_id = played['category']
+            question = Question.query.get(played['question_id'])
+
+            if question is None:
+                abort(404)
+
+            correct = evaluate_answer(question.answer, guess)
+            if correct:
+                scored, score, rank = leaderboard.record_answer(
+                    quiz_category_id, player, question.id)
+            else:
+                scored = False
+                score, rank = leaderboard.rank(
+                    quiz_category_id, player) or (0, None)
+
+            return jsonify({
+                'success': True,
+                'correct': correct,
+                'scored': scored,
+                'answer': question.answer,
+                'player': player,
+                'score': score,
+                'rank': rank
+            })
+        except():
+            abort(422)
+
+    '''
+  Leaderboard for a quiz category (id 0 for "ALL"),
+  highest score first, limited by the "limit" query parameter.
+  '''
+
+    @app.route('/categories/<int:category_id>/leaderboard')
+    def get_leaderboard(category_id):
+        try:
+            if category_id != 0 and Category.query.get(category_id) is None:
+                abort(404)
+
+            limit = request.args.get('limit', LEADERBOARD_SIZE, type=int)
+            if limit < 1:
+                abort(422)
+
+            entries, total_players = leaderboard.top(category_id, limit)
+
+            return jsonify({
+                'success': True,
+                'leaderboard': entries,
+                'total_players': total_players
+            })
+        except():
+            abort(500)
+
+    @app.route('/categories/<int:category_id>/leaderboard/<player>')
+    def get_player_rank(category_id, player):
+        try:
+            standing = leaderboard.rank(category_id, player)
+
+            if standing is None:
+                abort(404)
+
+            score, rank = standing
+
+            return jsonify({
+                'success': True,
+                'player': player,
+                'score': score,
+                'rank': rank
+            })
+        except():
+            abort(500)
+
+    '''
   @TODO: 
   Create error handlers for all expected errors 
   including 404 and 422. 
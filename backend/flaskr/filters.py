@@ -0,0 +1,110 @@
+from sqlalchemy import bindparam, func
+from sqlalchemy.ext import baked
+
+from flaskr.models import db, Question
+
+SORT_COLUMNS = {
+    'id': Question.id,
+    'difficulty': Question.difficulty,
+    'category': Question.category,
+}
+
+bakery = baked.bakery()
+
+
+def escape_like(value):
+    # match % and _ typed by the user literally
+    return value.replace('\\', '\\\\').replace(
+        '%', '\\%').replace('_', '\\_')
+
+
+def _int_arg(args, name):
+    value = args.get(name)
+    if value is None or value == '':
+        return None
+    return int(value)
+
+
+def parse_question_filters(args):
+    '''
+    parse_question_filters(args)
+        reads the /questions query string into a dict of filters,
+        raises ValueError for values that are not usable.
+        categories can be repeated or comma separated:
+        ?category=1&category=2 or ?category=1,2
+    '''
+    categories = []
+    for value in args.getlist('category'):
+        categories.extend(item for item in value.split(',') if item)
+
+    filters = {
+        'categories': [str(int(category)) for category in categories],
+        'min_difficulty': _int_arg(args, 'min_difficulty'),
+        'max_difficulty': _int_arg(args, 'max_difficulty'),
+        'min_id': _int_arg(args, 'min_id'),
+        'max_id': _int_arg(args, 'max_id'),
+        'search': args.get('search') or None,
+        'sort': args.get('sort', 'id'),
+    }
+
+    if filters['sort'].lstrip('-') not in SORT_COLUMNS:
+        raise ValueError('unknown sort column')
+
+    return filters
+
+
+def query_questions(filters, limit=None, offset=0):
+    '''
+    query_questions(filters, limit, offset)
+        runs the filters as one parameterized query and returns
+        (questions, total) where total counts every matching row.
+        the query is baked, so the SQL for a given combination of
+        filters is compiled once and reused with new parameters.
+    '''
+    query = bakery(lambda session: session.query(
+        Question, func.count(Question.id).over()))
+    params = {}
+
+    if filters['categories']:
+        query += lambda q: q.filter(
+            Question.category.in_(bindparam('categories', expanding=True)))
+        params['categories'] = filters['categories']
+    if filters['min_difficulty'] is not None:
+        query += lambda q: q.filter(
+            Question.difficulty >= bindparam('min_difficulty'))
+        params['min_difficulty'] = filters['min_difficulty']
+    if filters['max_difficulty'] is not None:
+        query += lambda q: q.filter(
+            Question.difficulty <= bindparam('max_difficulty'))
+        params['max_difficulty'] = filters['max_difficulty']
+    if filters['min_id'] is not None:
+        query += lambda q: q.filter(Question.id >= bindparam('min_id'))
+        params['min_id'] = filters['min_id']
+    if filters['max_id'] is not None:
+        query += lambda q: q.filter(Question.id <= bindparam('max_id'))
+        params['max_id'] = filters['max_id']
+    if filters['search'] is not None:
+        query += lambda q: q.filter(
+            Question.question.ilike(bindparam('search'), escape='\\'))
+        params['search'] = '%' + escape_like(filters['search']) + '%'
+
+    # the sort is part of the cache key, so each order is baked separately
+    sort = filters['sort']
+    column = SORT_COLUMNS[sort.lstrip('-')]
+    order = column.desc() if sort.startswith('-') else column.asc()
+    query.add_criteria(lambda q: q.order_by(order, Question.id), sort)
+
+    if limit is None:
+        rows = query(db.session()).params(**params).all()
+    else:
+        paged = query.with_criteria(lambda q: q.limit(
+            bindparam('limit')).offset(bindparam('offset')))
+        rows = paged(db.session()).params(
+            limit=limit, offset=offset, **params).all()
+
+    if rows:
+        return [question for question, _ in rows], rows[0][1]
+    if offset:
+        # past the last page there is no row carrying the window count
+        return [], query(db.session()).params(**params).count()
+    return [], 0
@@ -0,0 +1,245 @@
+import atexit
+import logging
+import threading
+
+from sqlalchemy.dialects.postgresql import insert
+
+from flaskr.models import db, Score, Answer
+from flaskr.ranking import SkipList
+
+FLUSH_INTERVAL = 30
+FLUSH_BATCH_SIZE = 50
+
+logger = logging.getLogger(__name__)
+
+
+def _set_score(boards, scores, category, player, score):
+    if category not in boards:
+        boards[category] = SkipList()
+        scores[category] = {}
+    old_score = scores[category].get(player)
+    if old_score is not None:
+        boards[category].remove((-old_score, player))
+    boards[category].insert((-score, player))
+    scores[category][player] = score
+
+
+class Leaderboard:
+    '''
+    Leaderboard
+        keeps every category's scores in a skip list ordered by
+        (-score, player) so top-N and rank lookups never touch the db.
+        a player scores each question at most once, the first correct
+        answer is queued and written back in a batch by a background
+        thread that wakes every FLUSH_INTERVAL seconds or once
+        FLUSH_BATCH_SIZE answers are queued, and once more at exit.
+
+        the answers table decides which answer counts, so workers
+        sharing the db never double count a replayed answer, and every
+        flush reloads the boards from the db so each worker also ranks
+        the points the other workers recorded.
+    '''
+
+    def __init__(self, app=None, flush_interval=FLUSH_INTERVAL,
+                 batch_size=FLUSH_BATCH_SIZE):
+        self.app = app
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._boards = {}
+        self._scores = {}
+        self._answered = set()
+        self._pending = {}
+        self._loaded = False
+        self._thread = None
+        self._wake = threading.Event()
+        self._stopping = threading.Event()
+
+    def _ensure_loaded(self):
+        if not self._loaded:
+            with self._flush_lock:
+                if not self._loaded:
+                    self._reload()
+        self._start()
+
+    def _start(self):
+        # started on first use rather than in create_app, so neither
+        # the reloader's watcher process nor an unused app gets one
+        if self.app is None or self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is not None or self._stopping.is_set():
+                return
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+        atexit.register(self._flush_in_context)
+
+    def stop(self):
+        '''
+        stops the background thread and writes what is still queued
+        '''
+        self._stopping.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join()
+            atexit.unregister(self._flush_in_context)
+        if self.app is not None and self._pending:
+            self._flush_in_context()
+
+    def _run(self):
+        while not self._stopping.is_set():
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            if self._stopping.is_set():
+                break
+            self._flush_in_context()
+
+    def _flush_in_context(self):
+        with self.app.app_context():
+            self.flush()
+
+    def _standing(self, category, player):
+        score = self._scores.get(category, {}).get(player)
+        if score is None:
+            return None
+        # ties share the rank of the best placed player on that score
+        return score, self._boards[category].bisect((-score, '')) + 1
+
+    def record_answer(self, category, player, question_id):
+        '''
+        scores a correct answer, returns (scored, score, rank).
+        scored is False when the player already scored that question.
+        '''
+        self._ensure_loaded()
+        with self._lock:
+            key = (player, question_id)
+            scored = key not in self._answered
+            if scored:
+                self._answered.add(key)
+                self._pending[key] = category
+                score = self._scores.get(category, {}).get(player, 0) + 1
+                _set_score(self._boards, self._scores,
+                           category, player, score)
+            standing = self._standing(category, player) or (0, None)
+            should_flush = len(self._pending) >= self.batch_size
+
+        if should_flush:
+            if self.app is None:
+                self.flush()
+            else:
+                self._wake.set()
+        return (scored,) + standing
+
+    def top(self, category, limit=10):
+        self._ensure_loaded()
+        with self._lock:
+            board = self._boards.get(category)
+            if board is None:
+                return [], 0
+            entries = board.first(limit)
+            total = len(board)
+
+        result = []
+        for position, (negative_score, player) in enumerate(entries):
+            if not result or result[-1]['score'] != -negative_score:
+                rank = position + 1
+            result.append({
+                'rank': rank,
+                'player': player,
+                'score': -negative_score
+            })
+        return result, total
+
+    def rank(self, category, player):
+        '''
+        returns (score, rank) for player or None when they have no score
+        '''
+        self._ensure_loaded()
+        with self._lock:
+            return self._standing(category, player)
+
+    def flush(self):
+        '''
+        writes queued answers and reloads the boards from the db,
+        returns False when the write failed. failed answers stay
+        queued and are retried by the next flush.
+        '''
+        with self._flush_lock:
+            written = self._write_pending()
+            try:
+                self._reload()
+            except Exception:
+                logger.exception('leaderboard reload failed')
+                db.session.rollback()
+            return written
+
+    def _write_pending(self):
+        with self._lock:
+            pending = self._pending
+            self._pending = {}
+
+        if not pending:
+            return True
+
+        try:
+            self._write(pending)
+            return True
+        except Exception:
+            logger.exception('leaderboard flush failed')
+            db.session.rollback()
+            with self._lock:
+                pending.update(self._pending)
+                self._pending = pending
+            return False
+
+    def _write(self, pending):
+        # only answers that are new to the answers table earn a point
+        statement = insert(Answer).values([
+            {'player': player, 'question_id': question_id}
+            for player, question_id in pending
+        ]).on_conflict_do_nothing().returning(
+            Answer.player, Answer.question_id)
+        inserted = db.session.execute(statement).fetchall()
+
+        points = {}
+        for player, question_id in inserted:
+            key = (pending[(player, question_id)], player)
+            points[key] = points.get(key, 0) + 1
+
+        if points:
+            statement = insert(Score).values([
+                {'category': category, 'player': player, 'score': score}
+                for (category, player), score in points.items()
+            ])
+            statement = statement.on_conflict_do_update(
+                index_elements=[Score.player, Score.category],
+                set_={'score': Score.score + statement.excluded.score})
+            db.session.execute(statement)
+        db.session.commit()
+
+    def _reload(self):
+        score_rows = db.session.query(
+            Score.category, Score.player, Score.score).all()
+        answer_rows = db.session.query(
+            Answer.player, Answer.question_id).all()
+        db.session.commit()
+
+        boards = {}
+        scores = {}
+        for category, player, score in score_rows:
+            _set_score(boards, scores, category, player, score)
+        answered = set(answer_rows)
+
+        with self._lock:
+            # answers queued since the write are not in the db yet
+            for key, category in self._pending.items():
+                if key not in answered:
+                    answered.add(key)
+                    player = key[0]
+                    score = scores.get(category, {}).get(player, 0) + 1
+                    _set_score(boards, scores, category, player, score)
+            self._boards = boards
+            self._scores = scores
+            self._answered = answered
+            self._loaded = True
@@ -1,5 +1,5 @@
 import os
-from sqlalchemy import Column, String, Integer, create_engine
+from sqlalchemy import Column, String, Integer, UniqueConstraint, Index, create_engine, inspect
 from flask_sqlalchemy import SQLAlchemy
 import json
 
@@ -18,6 +18,20 @@ def setup_db(app, database_path=database_path):
     db.app = app
     db.init_app(app)
     db.create_all()
+    create_missing_indexes()
+
+'''
+create_missing_indexes()
+    create_all skips tables that already exist, so indexes added to a
+    model later are created here for databases made before them
+'''
+def create_missing_indexes():
+    inspector = inspect(db.engine)
+    for table in db.metadata.sorted_tables:
+        existing = {index['name'] for index in inspector.get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name not in existing:
+                index.create(db.engine)
 
 '''
 Question
@@ -32,6 +46,10 @@ class Question(db.Model):
   category = Column(String)
   difficulty = Column(Integer)
 
+  __table_args__ = (
+    Index('ix_questions_category_difficulty', 'category', 'difficulty', 'id'),
+  )
+
   def __init__(self, question, answer, category, difficulty):
     self.question = question
     self.answer = answer
@@ -77,4 +95,64 @@ class Category(db.Model):
     return {
       'id': self.id,
       'type': self.type
-}
\ No newline at end of file
+}
+
+'''
+Score
+
+'''
+class Score(db.Model):  
+  __tablename__ = 'scores'
+
+  id = Column(Integer, primary_key=True)
+  player = Column(String, nullable=False)
+  category = Column(Integer, nullable=False)
+  score = Column(Integer, nullable=False, default=0)
+
+  __table_args__ = (UniqueConstraint('player', 'category'),)
+
+  def __init__(self, player, category, score=0):
+    self.player = player
+    self.category = category
+    self.score = score
+
+  def insert(self):
+    db.session.add(self)
+    db.session.commit()
+
+  def update(self):
+    db.session.commit()
+
+  @property
+  def format(self):
+    return {
+      'id': self.id,
+      'player': self.player,
+      'category': self.category,
+      'score': self.score
+    }
+
+'''
+Answer
+    a question a player has already scored a point for
+'''
+class Answer(db.Model):  
+  __tablename__ = 'answers'
+
+  id = Column(Integer, primary_key=True)
+  player = Column(String, nullable=False)
+  question_id = Column(Integer, nullable=False)
+
+  __table_args__ = (UniqueConstraint('player', 'question_id'),)
+
+  def __init__(self, player, question_id):
+    self.player = player
+    self.question_id = question_id
+
+  @property
+  def format(self):
+    return {
+      'id': self.id,
+      'player': self.player,
+      'question_id': self.question_id
+    }
@@ -0,0 +1,125 @@
+import random
+
+MAX_LEVEL = 24
+LEVEL_PROBABILITY = 0.5
+
+
+class _Node:
+    __slots__ = ('key', 'forward', 'width')
+
+    def __init__(self, key, level):
+        self.key = key
+        self.forward = [None] * level
+        self.width = [1] * level
+
+
+class SkipList:
+    '''
+    SkipList
+        indexable skip list that keeps keys in ascending order.
+        every link stores how many bottom-level nodes it skips, so
+        insert, remove and rank are all O(log n) on average.
+    '''
+
+    def __init__(self):
+        self.head = _Node(None, MAX_LEVEL)
+        self.size = 0
+
+    def __len__(self):
+        return self.size
+
+    def __iter__(self):
+        node = self.head.forward[0]
+        while node is not None:
+            yield node.key
+            node = node.forward[0]
+
+    def __contains__(self, key):
+        try:
+            self.rank(key)
+            return True
+        except KeyError:
+            return False
+
+    def _random_level(self):
+        level = 1
+        while level < MAX_LEVEL and random.random() < LEVEL_PROBABILITY:
+            level += 1
+        return level
+
+    def insert(self, key):
+        update = [None] * MAX_LEVEL
+        steps_at_level = [0] * MAX_LEVEL
+        node = self.head
+        for i in reversed(range(MAX_LEVEL)):
+            while node.forward[i] is not None and node.forward[i].key < key:
+                steps_at_level[i] += node.width[i]
+                node = node.forward[i]
+            update[i] = node
+
+        level = self._random_level()
+        new_node = _Node(key, level)
+        steps = 0
+        for i in range(level):
+            prev = update[i]
+            new_node.forward[i] = prev.forward[i]
+            prev.forward[i] = new_node
+            new_node.width[i] = prev.width[i] - steps
+            prev.width[i] = steps + 1
+            steps += steps_at_level[i]
+        for i in range(level, MAX_LEVEL):
+            update[i].width[i] += 1
+        self.size += 1
+
+    def remove(self, key):
+        update = [None] * MAX_LEVEL
+        node = self.head
+        for i in reversed(range(MAX_LEVEL)):
+            while node.forward[i] is not None and node.forward[i].key < key:
+                node = node.forward[i]
+            update[i] = node
+
+        target = update[0].forward[0]
+        if target is None or target.key != key:
+            raise KeyError(key)
+
+        level = len(target.forward)
+        for i in range(level):
+            prev = update[i]
+            prev.width[i] += target.width[i] - 1
+            prev.forward[i] = target.forward[i]
+        for i in range(level, MAX_LEVEL):
+            update[i].width[i] -= 1
+        self.size -= 1
+
+    def _find(self, key):
+        position = 0
+        node = self.head
+        for i in reversed(range(MAX_LEVEL)):
+            while node.forward[i] is not None and node.forward[i].key < key:
+                position += node.width[i]
+                node = node.forward[i]
+        return position, node.forward[0]
+
+    def bisect(self, key):
+        '''
+        number of keys lower than key, whether or not key is present
+        '''
+        return self._find(key)[0]
+
+    def rank(self, key):
+        '''
+        zero based position of key, raises KeyError when it is missing
+        '''
+        position, target = self._find(key)
+        if target is None or target.key != key:
+            raise KeyError(key)
+        return position
+
+    def first(self, count):
+        result = []
+        node = self.head.forward[0]
+        while node is not None and len(result) < count:
+            result.append(node.key)
+            node = node.forward[0]
+        return result
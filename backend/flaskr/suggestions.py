@@ -0,0 +1,117 @@
+import re
+import threading
+
+from flaskr.models import Question
+from flaskr.trie import Trie, ALL_CATEGORIES, MAX_COMPLETIONS
+
+WORD_PATTERN = re.compile(r"[a-z0-9']+")
+MIN_WORD_LENGTH = 2
+
+
+def question_terms(text):
+    '''
+    words of the question plus the whole question as a title
+    '''
+    text = (text or '').lower().strip()
+    terms = {word for word in WORD_PATTERN.findall(text)
+             if len(word) >= MIN_WORD_LENGTH}
+    if text:
+        terms.add(text)
+    return terms
+
+
+def _add(trie, questions, question_id, category, text):
+    if question_id in questions:
+        return
+    try:
+        category = int(category)
+    except (TypeError, ValueError):
+        # rows without a category id can't be placed on a board
+        return
+    terms = question_terms(text)
+    for term in terms:
+        trie.add(term, category)
+    questions[question_id] = (category, terms)
+
+
+def _remove(trie, questions, question_id):
+    entry = questions.pop(question_id, None)
+    if entry is None:
+        return
+    category, terms = entry
+    for term in terms:
+        trie.remove(term, category)
+
+
+class SuggestionIndex:
+    '''
+    SuggestionIndex
+        typeahead index over question words and titles. start() builds
+        the trie from the db in a background thread so app boot never
+        waits for it, suggest() returns nothing until the build is done.
+        questions created or deleted meanwhile are applied on top of the
+        build, and afterwards the index is kept current directly.
+    '''
+
+    def __init__(self, app=None):
+        self.app = app
+        self._lock = threading.Lock()
+        self._trie = Trie()
+        self._questions = {}
+        self._removed = set()
+        self._built = threading.Event()
+
+    def start(self):
+        thread = threading.Thread(target=self._build, daemon=True)
+        thread.start()
+
+    def wait(self, timeout=None):
+        '''
+        blocks until the build is done, returns False on timeout
+        '''
+        return self._built.wait(timeout)
+
+    def _build(self):
+        with self.app.app_context():
+            rows = Question.query.with_entities(
+                Question.id, Question.category, Question.question).all()
+
+        # the trie is built without the lock, so lookups and question
+        # changes only wait for the swap below
+        trie = Trie()
+        questions = {}
+        for question_id, category, text in rows:
+            if question_id not in self._removed:
+                _add(trie, questions, question_id, category, text)
+
+        with self._lock:
+            for question_id in self._removed:
+                _remove(trie, questions, question_id)
+            for question_id, (category, terms) in self._questions.items():
+                if question_id not in questions:
+                    for term in terms:
+                        trie.add(term, category)
+                    questions[question_id] = (category, terms)
+            self._trie = trie
+            self._questions = questions
+            self._removed = set()
+            self._built.set()
+
+    def add_question(self, question):
+        with self._lock:
+            _add(self._trie, self._questions, question.id,
+                 question.category, question.question)
+
+    def remove_question(self, question_id):
+        with self._lock:
+            if not self._built.is_set():
+                self._removed.add(question_id)
+            _remove(self._trie, self._questions, question_id)
+
+    def suggest(self, prefix, category=ALL_CATEGORIES,
+                limit=MAX_COMPLETIONS):
+        prefix = prefix.lower().lstrip()
+        if not prefix or not self._built.is_set():
+            return []
+        with self._lock:
+            return self._trie.complete(prefix, category, limit)
@@ -0,0 +1,90 @@
+import heapq
+
+ALL_CATEGORIES = 0
+MAX_COMPLETIONS = 10
+
+
+class _Node:
+    __slots__ = ('children', 'counts', 'term', 'top')
+
+    def __init__(self):
+        self.children = {}
+        self.counts = {}
+        self.term = None
+        self.top = {}
+
+
+class Trie:
+    '''
+    Trie
+        prefix tree of terms counted per category. every node caches
+        its best MAX_COMPLETIONS completions per category, the caches on
+        a term's path are dropped whenever that term is added or removed.
+    '''
+
+    def __init__(self):
+        self.root = _Node()
+
+    def _path(self, term):
+        node = self.root
+        path = [node]
+        for char in term:
+            node = node.children.get(char)
+            if node is None:
+                return None
+            path.append(node)
+        return path
+
+    def add(self, term, category):
+        node = self.root
+        node.top.clear()
+        for char in term:
+            node = node.children.setdefault(char, _Node())
+            node.top.clear()
+        node.term = term
+        for key in (category, ALL_CATEGORIES):
+            node.counts[key] = node.counts.get(key, 0) + 1
+
+    def remove(self, term, category):
+        path = self._path(term)
+        if path is None or category not in path[-1].counts:
+            raise KeyError(term)
+
+        node = path[-1]
+        for key in (category, ALL_CATEGORIES):
+            node.counts[key] -= 1
+            if node.counts[key] == 0:
+                del node.counts[key]
+        for path_node in path:
+            path_node.top.clear()
+
+        # prune nodes that no longer lead to any term
+        for depth in range(len(term), 0, -1):
+            child = path[depth]
+            if child.counts or child.children:
+                break
+            del path[depth - 1].children[term[depth - 1]]
+
+    def _collect(self, node, category):
+        stack = [node]
+        while stack:
+            node = stack.pop()
+            count = node.counts.get(category)
+            if count:
+                yield -count, node.term
+            stack.extend(node.children.values())
+
+    def complete(self, prefix, category=ALL_CATEGORIES,
+                 limit=MAX_COMPLETIONS):
+        '''
+        most frequent terms starting with prefix, ties ordered by term
+        '''
+        path = self._path(prefix)
+        if path is None:
+            return []
+
+        node = path[-1]
+        if category not in node.top:
+            node.top[category] = [term for _, term in heapq.nsmallest(
+                MAX_COMPLETIONS, self._collect(node, category))]
+        return node.top[category][:limit]
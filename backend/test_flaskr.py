@@ -1,10 +1,16 @@
 import os
 import unittest
 import json
+import uuid
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import inspect
 
 from flaskr import create_app
-from flaskr.models import setup_db, Question, Category
+from flaskr.models import setup_db, db, Question, Category, Score, Answer
+from flaskr.leaderboard import Leaderboard
+from flaskr.ranking import SkipList
+from flaskr.trie import Trie
+from flaskr.suggestions import SuggestionIndex
 
 
 class TriviaTestCase(unittest.TestCase):
@@ -12,12 +18,11 @@ class TriviaTestCase(unittest.TestCase):
 
     def setUp(self):
         """Define test variables and initialize app."""
-        self.app = create_app()
-        self.client = self.app.test_client
         self.database_name = "trivia_test"
         self.database_path = "postgres://{}:{}@{}/{}".format(
             'postgres', 'psql', 'localhost:5432', self.database_name)
-        setup_db(self.app, self.database_path)
+        self.app = create_app({'DATABASE_PATH': self.database_path})
+        self.client = self.app.test_client
         
         self.new_question = {
             'question': 'New question',
@@ -42,7 +47,7 @@ class TriviaTestCase(unittest.TestCase):
 
     def tearDown(self):
         """Executed after reach test"""
-        pass
+        self.app.extensions['leaderboard'].stop()
 
     """
     This test validates all successful operations and expected errors.
@@ -97,7 +102,7 @@ class TriviaTestCase(unittest.TestCase):
             self.assertTrue(data['total_questions'])
 
     def test_get_questions_beyond_limit(self):
-         """
+        """
         This test returns success when page is found but return false when page is not found.
     
         """
@@ -108,8 +113,97 @@ class TriviaTestCase(unittest.TestCase):
         self.assertEqual(data['success'], True)
         self.assertEqual(len(data['questions']), 0)
 
+    def test_get_filtered_questions(self):
+        """
+        This test returns only questions matching every filter.
+    
+        """
+        res = self.client().get(
+            '/questions?category=1,2&min_difficulty=4&max_id=23&sort=-id&page=1')
+        data = json.loads(res.data)
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(data['success'], True)
+        self.assertEqual(data['total_questions'], 3)
+        self.assertEqual([q['id'] for q in data['questions']], [22, 20, 18])
+
+    def test_get_filtered_questions_difficulty_range(self):
+        """
+        This test returns only questions inside the difficulty range.
+    
+        """
+        res = self.client().get(
+            '/questions?category=3&min_difficulty=2&max_difficulty=3&max_id=23')
+        data = json.loads(res.data)
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(data['total_questions'], 3)
+        self.assertEqual([q['id'] for q in data['questions']], [13, 14, 15])
+
+    def test_get_filtered_questions_beyond_last_page(self):
+        """
+        This test returns no questions but the full count past the last page.
+    
+        """
+        res = self.client().get(
+            '/questions?category=1,2&min_difficulty=4&max_id=23&page=2')
+        data = json.loads(res.data)
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(data['questions'], [])
+        self.assertEqual(data['total_questions'], 3)
+
+    def test_get_filtered_questions_search_wildcards(self):
+        """
+        This test asserts % and _ in a search are matched literally.
+    
+        """
+        for search in ['%25', '_']:
+            res = self.client().get('/questions?max_id=23&search=' + search)
+            data = json.loads(res.data)
+
+            self.assertEqual(res.status_code, 200)
+            self.assertEqual(data['total_questions'], 0)
+
+    def test_get_questions_invalid_page(self):
+        """
+        This test returns 422 for a page that is not a number.
+    
+        """
+        res = self.client().get('/questions?page=abc')
+        data = json.loads(res.data)
+
+        self.assertEqual(res.status_code, 422)
+        self.assertEqual(data['success'], False)
+
+    def test_get_filtered_questions_invalid(self):
+        """
+        This test returns 422 for an unknown sort column.
+    
+        """
+        res = self.client().get('/questions?sort=answer')
+        data = json.loads(res.data)
+
+        self.assertEqual(res.status_code, 422)
+        self.assertEqual(data['success'], False)
+        self.assertEqual(data['error'], 422)
+
+    def test_setup_db_creates_missing_index(self):
+        """
+        This test asserts setup_db adds the questions index to an existing table.
+    
+        """
+        with self.app.app_context():
+            db.session.execute('DROP INDEX ix_questions_category_difficulty')
+            db.session.commit()
+
+            setup_db(self.app, self.database_path)
+
+            names = [index['name'] for index in inspect(db.engine).get_indexes('questions')]
+            self.assertIn('ix_questions_category_difficulty', names)
+
     def test_get_question(self):
-         """
+        """
         This test returns success if a specific question is found
         """
         res = self.client().get('/questions/2')
@@ -120,7 +214,7 @@ class TriviaTestCase(unittest.TestCase):
         self.assertTrue(data['question'])
 
     def test_get_question_not_found(self):
-         """
+        """
         This test returns false when no specific question is found
         """
         res = self.client().get('/questions/999')
@@ -134,7 +228,7 @@ class TriviaTestCase(unittest.TestCase):
     
 
     def test_get_category_not_found(self):
-         """
+        """
         This test returns 404 when no specific category is found
     
         """
@@ -147,7 +241,7 @@ class TriviaTestCase(unittest.TestCase):
         self.assertTrue(data['message'])
 
     def test_get_category_questions(self):
-         """
+        """
         This test returns true when a questions are found under a specific category.
     
         """
@@ -222,6 +316,96 @@ class TriviaTestCase(unittest.TestCase):
         self.assertEqual(len(data['questions']), 0)
         self.assertEqual(data['total_questions'], 0)
 
+    def test_get_question_suggestions(self):
+        """
+        This test returns completions for a prefix of a question word.
+    
+        """
+        self.app.extensions['suggestions'].wait()
+        res = self.client().get('/questions/suggestions?q=tit')
+        data = json.loads(res.data)
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(data['success'], True)
+        self.assertIn('title', data['suggestions'])
+
+    def test_get_question_suggestions_no_results(self):
+        """
+        This test returns no completions for an unknown prefix.
+    
+        """
+        res = self.client().get('/questions/suggestions?q=zombie')
+        data = json.loads(res.data)
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(data['success'], True)
+        self.assertEqual(data['suggestions'], [])
+
+    def test_question_suggestions_follow_changes(self):
+        """
+        This test asserts suggestions pick up created questions and drop deleted ones.
+    
+        """
+        word = 'zq{}'.format(uuid.uuid4().hex[:12])
+        res = self.client().post('/questions', json={
+            'question': 'Which word is {}?'.format(word),
+            'answer': 'This one',
+            'category': 3,
+            'difficulty': 1
+        })
+        created = json.loads(res.data)['created']
+        self.app.extensions['suggestions'].wait()
+
+        res = self.client().get('/questions/suggestions?q=' + word[:8])
+        data = json.loads(res.data)
+        self.assertIn(word, data['suggestions'])
+
+        res = self.client().get(
+            '/questions/suggestions?category=3&q=' + word[:8])
+        data = json.loads(res.data)
+        self.assertIn(word, data['suggestions'])
+
+        self.client().delete('/questions/{}'.format(created))
+
+        res = self.client().get('/questions/suggestions?q=' + word[:8])
+        data = json.loads(res.data)
+        self.assertNotIn(word, data['suggestions'])
+
+    def test_question_suggestions_before_build(self):
+        """
+        This test asserts lookups return nothing instead of waiting for the build.
+    
+        """
+        index = SuggestionIndex(self.app)
+        self.assertEqual(index.suggest('tit'), [])
+
+        index.start()
+        self.assertTrue(index.wait(10))
+        self.assertIn('title', index.suggest('tit'))
+
+    def test_get_question_suggestions_limit_too_large(self):
+        """
+        This test returns 422 for a limit above the cached completions.
+    
+        """
+        res = self.client().get('/questions/suggestions?q=ti&limit=50')
+        data = json.loads(res.data)
+
+        self.assertEqual(res.status_code, 422)
+        self.assertEqual(data['success'], False)
+
+    def test_create_question_unknown_category(self):
+        """
+        This test returns 422 for a question whose category is not a category id.
+    
+        """
+        question = dict(self.new_question, category='Science')
+        res = self.client().post('/questions', json=question)
+        data = json.loads(res.data)
+
+        self.assertEqual(res.status_code, 422)
+        self.assertEqual(data['success'], False)
+
     def test_delete_question(self):
         """
         This test return 200 status code for a successful delete question
@@ -262,9 +446,10 @@ class TriviaTestCase(unittest.TestCase):
         self.assertEqual(data['success'], True)
         self.assertTrue(data['question'])
         self.assertTrue(data['question']['question'])
-        self.assertTrue(data['question']['answer'])
+        self.assertNotIn('answer', data['question'])
         self.assertTrue(data['question']['difficulty'])
         self.assertTrue(data['question']['category'])
+        self.assertTrue(data['token'])
 
     def test_post_quizzes_incorrect(self):
         """
@@ -279,6 +464,283 @@ class TriviaTestCase(unittest.TestCase):
         self.assertEqual(data['error'], 422)
         self.assertTrue(data['message'])
 
+    def play(self, player, category_id, question_id=None):
+        """Serve a question of the category, question_id picks which one"""
+        previous_questions = []
+        if question_id is not None:
+            query = Question.query.filter(Question.id != question_id)
+            if category_id != 0:
+                query = query.filter(Question.category == str(category_id))
+            previous_questions = [question.id for question in query.all()]
+
+        res = self.client().post('/quizzes', json={
+            'player': player,
+            'previous_questions': previous_questions,
+            'quiz_category': {'type': 'Quiz', 'id': category_id}
+        })
+        return json.loads(res.data)
+
+    def answer(self, token, guess):
+        return self.client().post('/quizzes/answer', json={
+            'token': token,
+            'guess': guess
+        })
+
+    def new_player(self):
+        return 'tester-{}'.format(uuid.uuid4().hex)
+
+    def test_submit_quiz_answer(self):
+        """
+        This test returns the player's score and rank after a correct answer.
+    
+        """
+        player = self.new_player()
+        played = self.play(player, 2, question_id=17)
+        res = self.answer(played['token'], 'mona lisa!')
+        data = json.loads(res.data)
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(data['success'], True)
+        self.assertTrue(data['correct'])
+        self.assertTrue(data['scored'])
+        self.assertEqual(data['answer'], 'Mona Lisa')
+        self.assertEqual(data['score'], 1)
+        self.assertTrue(data['rank'])
+
+        res = self.client().get('/categories/2/leaderboard/' + player)
+        data = json.loads(res.data)
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(data['score'], 1)
+        self.assertTrue(data['rank'])
+
+    def test_submit_quiz_answer_replayed(self):
+        """
+        This test asserts a question scores only once per player.
+    
+        """
+        player = self.new_player()
+        played = self.play(player, 2, question_id=17)
+        self.answer(played['token'], 'Mona Lisa')
+        res = self.answer(played['token'], 'Mona Lisa')
+        data = json.loads(res.data)
+
+        self.assertEqual(res.status_code, 200)
+        self.assertTrue(data['correct'])
+        self.assertFalse(data['scored'])
+        self.assertEqual(data['score'], 1)
+
+        played = self.play(player, 0, question_id=17)
+        data = json.loads(self.answer(played['token'], 'Mona Lisa').data)
+        self.assertFalse(data['scored'])
+
+    def test_submit_quiz_answer_partial_guess(self):
+        """
+        This test asserts a single word of the answer is not correct.
+    
+        """
+        player = self.new_player()
+        played = self.play(player, 3, question_id=14)
+        data = json.loads(self.answer(played['token'], 'of').data)
+
+        self.assertFalse(data['correct'])
+        self.assertFalse(data['scored'])
+        self.assertEqual(data['score'], 0)
+
+        data = json.loads(
+            self.answer(played['token'], 'Palace of Versailles').data)
+        self.assertTrue(data['correct'])
+        self.assertTrue(data['scored'])
+
+    def test_submit_quiz_answer_without_token(self):
+        """
+        This test return message with 422 status code for an answer without a token.
+    
+        """
+        res = self.client().post('/quizzes/answer', json={'guess': 'One'})
+        data = json.loads(res.data)
+
+        self.assertEqual(res.status_code, 422)
+        self.assertEqual(data['success'], False)
+        self.assertEqual(data['error'], 422)
+
+    def test_submit_quiz_answer_forged_token(self):
+        """
+        This test returns 422 for a token the server did not sign.
+    
+        """
+        played = self.play(self.new_player(), 2, question_id=18)
+        res = self.answer(played['token'] + 'x', 'One')
+        data = json.loads(res.data)
+
+        self.assertEqual(res.status_code, 422)
+        self.assertEqual(data['success'], False)
+
+    def test_post_quizzes_invalid_category(self):
+        """
+        This test returns 422 for quiz categories that are not category ids.
+    
+        """
+        for quiz_category in [{'id': 'foo'}, {'id': '2'}, {'id': 99999}, 'Art']:
+            res = self.client().post('/quizzes', json={
+                'previous_questions': [],
+                'quiz_category': quiz_category
+            })
+            data = json.loads(res.data)
+
+            self.assertEqual(res.status_code, 422)
+            self.assertEqual(data['success'], False)
+
+    def test_get_leaderboard(self):
+        """
+        This test returns the leaderboard for all categories.
+    
+        """
+        played = self.play(self.new_player(), 0, question_id=18)
+        res = self.answer(played['token'], 'One')
+        self.assertEqual(res.status_code, 200)
+
+        res = self.client().get('/categories/0/leaderboard?limit=5')
+        data = json.loads(res.data)
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(data['success'], True)
+        self.assertTrue(data['leaderboard'])
+        self.assertLessEqual(len(data['leaderboard']), 5)
+        self.assertGreaterEqual(data['total_players'], 1)
+        self.assertEqual(data['leaderboard'][0]['rank'], 1)
+
+    def test_leaderboard_flush(self):
+        """
+        This test asserts a scored answer is written to the db.
+    
+        """
+        player = self.new_player()
+        with self.app.app_context():
+            Leaderboard(batch_size=1).record_answer(2, player, 16)
+
+            row = Score.query.filter(
+                Score.category == 2, Score.player == player).one_or_none()
+
+            self.assertIsNotNone(row)
+            self.assertEqual(row.score, 1)
+            self.assertTrue(Answer.query.filter(
+                Answer.player == player, Answer.question_id == 16).one())
+
+    def test_leaderboard_reload(self):
+        """
+        This test asserts a fresh leaderboard reloads flushed scores.
+    
+        """
+        player = self.new_player()
+        with self.app.app_context():
+            leaderboard = Leaderboard(batch_size=1)
+            leaderboard.record_answer(2, player, 16)
+            leaderboard.record_answer(2, player, 17)
+
+            self.assertEqual(Leaderboard().rank(2, player), leaderboard.rank(2, player))
+            self.assertEqual(leaderboard.rank(2, player)[0], 2)
+
+    def test_leaderboard_workers(self):
+        """
+        This test asserts workers sharing the db merge points and count a replay once.
+    
+        """
+        player = self.new_player()
+        with self.app.app_context():
+            first = Leaderboard(batch_size=1)
+            second = Leaderboard(batch_size=1)
+            # both load before either one has written the answer
+            self.assertIsNone(first.rank(2, player))
+            self.assertIsNone(second.rank(2, player))
+            first.record_answer(2, player, 16)
+            second.record_answer(2, player, 16)
+            second.record_answer(2, player, 17)
+
+            row = Score.query.filter(
+                Score.category == 2, Score.player == player).one()
+            self.assertEqual(row.score, 2)
+            self.assertEqual(second.rank(2, player)[0], 2)
+
+            first.flush()
+            self.assertEqual(first.rank(2, player), second.rank(2, player))
+
+    def test_leaderboard_ties(self):
+        """
+        This test asserts players with the same score share a rank.
+    
+        """
+        players = sorted(self.new_player() for _ in range(3))
+        with self.app.app_context():
+            leaderboard = Leaderboard(batch_size=1000)
+            for player in players:
+                leaderboard.record_answer(6, player, 10)
+            leaderboard.record_answer(6, players[2], 11)
+
+            leader = leaderboard.rank(6, players[2])[1]
+            self.assertEqual(leaderboard.rank(6, players[0])[1], leader + 1)
+            self.assertEqual(leaderboard.rank(6, players[1])[1], leader + 1)
+
+    def test_get_player_rank_not_found(self):
+        """
+        This test returns 404 for a player without a score.
+    
+        """
+        res = self.client().get('/categories/1/leaderboard/nobody-played')
+        data = json.loads(res.data)
+
+        self.assertEqual(res.status_code, 404)
+        self.assertEqual(data['success'], False)
+
+
+class SkipListTestCase(unittest.TestCase):
+    """This class tests the ranking structure used by the leaderboard"""
+
+    def test_rank_and_first(self):
+        ranking = SkipList()
+        keys = [(-3, 'c'), (-5, 'a'), (-1, 'e'), (-4, 'b'), (-2, 'd')]
+        for key in keys:
+            ranking.insert(key)
+
+        self.assertEqual(len(ranking), 5)
+        self.assertEqual(ranking.first(2), [(-5, 'a'), (-4, 'b')])
+        self.assertEqual(ranking.rank((-1, 'e')), 4)
+
+        ranking.remove((-5, 'a'))
+        self.assertEqual(ranking.rank((-4, 'b')), 0)
+        self.assertEqual(list(ranking), sorted(keys)[1:])
+        self.assertRaises(KeyError, ranking.remove, (-5, 'a'))
+
+    def test_bisect(self):
+        ranking = SkipList()
+        for key in [(-5, 'a'), (-3, 'b'), (-3, 'c'), (-1, 'd')]:
+            ranking.insert(key)
+
+        self.assertEqual(ranking.bisect((-3, '')), 1)
+        self.assertEqual(ranking.bisect((-2, '')), 3)
+        self.assertEqual(ranking.bisect((-9, '')), 0)
+        self.assertEqual(ranking.bisect((0, '')), 4)
+
+
+class TrieTestCase(unittest.TestCase):
+    """This class tests the prefix index used by question suggestions"""
+
+    def test_complete(self):
+        trie = Trie()
+        trie.add('title', 1)
+        trie.add('title', 2)
+        trie.add('tiger', 1)
+        trie.add('time', 2)
+
+        self.assertEqual(trie.complete('ti'), ['title', 'tiger', 'time'])
+        self.assertEqual(trie.complete('ti', 2), ['time', 'title'])
+        self.assertEqual(trie.complete('ti', 1, 1), ['tiger'])
+
+        trie.remove('title', 2)
+        self.assertEqual(trie.complete('ti', 2), ['time'])
+        self.assertEqual(trie.complete('zo'), [])
+        self.assertRaises(KeyError, trie.remove, 'title', 2)
+
 # Make the tests conveniently executable
 if __name__ == "__main__":
     unittest.main()
@@ -16,6 +16,10 @@ class QuizView extends Component {
       numCorrect: 0,
       currentQuestion: {},
       guess: "",
+      player: "",
+      token: null,
+      answer: "",
+      correct: false,
       forceEnd: false
     };
   }
@@ -56,7 +60,8 @@ class QuizView extends Component {
       contentType: "application/json",
       data: JSON.stringify({
         previous_questions: previousQuestions,
-        quiz_category: this.state.quizCategory
+        quiz_category: this.state.quizCategory,
+        player: this.state.player || "anonymous"
       }),
       xhrFields: {
         withCredentials: true
@@ -67,6 +72,8 @@ class QuizView extends Component {
           showAnswer: false,
           previousQuestions: previousQuestions,
           currentQuestion: result.question,
+          token: result.token,
+          answer: "",
           guess: "",
           forceEnd: result.question ? false : true
         });
@@ -81,11 +88,32 @@ class QuizView extends Component {
 
   submitGuess = event => {
     event.preventDefault();
-    const formatGuess = this.state.guess.replace(/[.,\/#!$%\^&\*;:{}=\-_`~()]/g, "").toLowerCase();
-    let evaluate = this.evaluateAnswer();
-    this.setState({
-      numCorrect: !evaluate ? this.state.numCorrect : this.state.numCorrect + 1,
-      showAnswer: true
+    $.ajax({
+      url: "/quizzes/answer",
+      type: "POST",
+      dataType: "json",
+      contentType: "application/json",
+      data: JSON.stringify({
+        token: this.state.token,
+        guess: this.state.guess
+      }),
+      xhrFields: {
+        withCredentials: true
+      },
+      crossDomain: true,
+      success: result => {
+        this.setState({
+          numCorrect: result.correct ? this.state.numCorrect + 1 : this.state.numCorrect,
+          correct: result.correct,
+          answer: result.answer,
+          showAnswer: true
+        });
+        return;
+      },
+      error: error => {
+        alert("Unable to submit answer. Please try your request again");
+        return;
+      }
     });
   };
 
@@ -97,6 +125,9 @@ class QuizView extends Component {
       numCorrect: 0,
       currentQuestion: {},
       guess: "",
+      token: null,
+      answer: "",
+      correct: false,
       forceEnd: false
     });
   };
@@ -104,6 +135,7 @@ class QuizView extends Component {
   renderPrePlay() {
     return (
       <div className="quiz-play-holder">
+        <input type="text" name="player" placeholder="Player name" value={this.state.player} onChange={this.handleChange} />
         <div className="choose-header">Choose Category</div>
         <div className="category-holder">
           <div className="play-category" onClick={this.selectCategory}>
@@ -143,22 +175,15 @@ class QuizView extends Component {
     );
   }
 
-  evaluateAnswer = () => {
-    const formatGuess = this.state.guess.replace(/[.,\/#!$%\^&\*;:{}=\-_`~()]/g, "").toLowerCase();
-    const answerArray = this.state.currentQuestion.answer.toLowerCase().split(" ");
-    return answerArray.includes(formatGuess);
-  };
-
   renderCorrectAnswer() {
-    const formatGuess = this.state.guess.replace(/[.,\/#!$%\^&\*;:{}=\-_`~()]/g, "").toLowerCase();
-    let evaluate = this.evaluateAnswer();
+    const evaluate = this.state.correct;
     return (
       <div className="quiz-play-holder">
         <div className="quiz-question">{this.state.currentQuestion.question}</div>
         <div className={`${evaluate ? "correct" : "wrong"}`}>
           {evaluate ? "You were correct!" : "You were incorrect"}
         </div>
-        <div className="quiz-answer">{this.state.currentQuestion.answer}</div>
+        <div className="quiz-answer">{this.state.answer}</div>
         <div className="next-question button" onClick={this.getNextQuestion}>
           {" "}
           Next Question{" "}
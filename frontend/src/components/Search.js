@@ -1,8 +1,12 @@
 import React, { Component } from 'react'
+import $ from 'jquery';
+
+const suggestionDelay = 150;
 
 class Search extends Component {
   state = {
     query: '',
+    suggestions: [],
   }
 
   getInfo = (event) => {
@@ -10,10 +14,50 @@ class Search extends Component {
     this.props.submitSearch(this.state.query)
   }
 
+  componentWillUnmount() {
+    clearTimeout(this.suggestionTimer)
+    if (this.suggestionRequest) {
+      this.suggestionRequest.abort()
+    }
+  }
+
+  getSuggestions = (query) => {
+    if (this.suggestionRequest) {
+      this.suggestionRequest.abort()
+    }
+    this.suggestionRequest = $.ajax({
+      url: `/questions/suggestions?q=${encodeURIComponent(query)}`,
+      type: "GET",
+      success: (result) => {
+        if (this.state.query === query) {
+          this.setState({ suggestions: result.suggestions })
+        }
+        return;
+      },
+      error: (error) => {
+        if (error.statusText !== 'abort') {
+          this.setState({ suggestions: [] })
+        }
+        return;
+      }
+    })
+  }
+
   handleInputChange = () => {
+    const query = this.search.value
     this.setState({
-      query: this.search.value
+      query: query
     })
+    clearTimeout(this.suggestionTimer)
+    if (query.trim()) {
+      this.suggestionTimer = setTimeout(
+        () => this.getSuggestions(query), suggestionDelay)
+    } else {
+      if (this.suggestionRequest) {
+        this.suggestionRequest.abort()
+      }
+      this.setState({ suggestions: [] })
+    }
   }
 
   render() {
@@ -21,9 +65,15 @@ class Search extends Component {
       <form onSubmit={this.getInfo}>
         <input
           placeholder="Search questions..."
+          list="search-suggestions"
           ref={input => this.search = input}
           onChange={this.handleInputChange}
         />
+        <datalist id="search-suggestions">
+          {this.state.suggestions.map(suggestion => (
+            <option key={suggestion} value={suggestion} />
+          ))}
+        </datalist>
         <input type="submit" value="Submit" className="button"/>
       </form>
     )